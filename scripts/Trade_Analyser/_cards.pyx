@@ -0,0 +1,48 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# Optional C implementation of the weekly card formatting in trade_analyser.py.
+# Build in place with:  cythonize -i _cards.pyx
+from libc.stdio cimport snprintf
+from libc.stdlib cimport malloc, free
+from libc.stdint cimport int64_t
+from libc.math cimport isnan, fabs
+
+# Must produce the same text as iter_week_cards in trade_analyser.py;
+# test_fast_paths.py checks this.
+cdef const char* CARD_FORMAT = (
+    b"\n"
+    b"                    <div class=\"week-box\">\n"
+    b"                        <strong>Week %lld, %lld</strong><br>\n"
+    b"                        Trades: %lld<br>\n"
+    b"                        Net P&L: <span class=\"%s\">$%.2f</span>\n"
+    b"                    </div>\n"
+    b"                    "
+)
+
+# Upper bound on one formatted card, including the widest possible %.2f value
+cdef enum:
+    CARD_MAX = 640
+
+def build_cards(const int64_t[::1] years, const int64_t[::1] weeks,
+                const int64_t[::1] counts, const double[::1] pls):
+    """Format every weekly card into one bytes object."""
+    cdef Py_ssize_t n = pls.shape[0]
+    cdef Py_ssize_t i
+    cdef Py_ssize_t used = 0
+    cdef double pl
+    cdef char* buf = <char*>malloc(n * CARD_MAX + 1)
+    if buf == NULL:
+        raise MemoryError()
+    try:
+        for i in range(n):
+            pl = pls[i]
+            # printf shows a sign-bit NaN as "-nan"; Python always prints "nan"
+            if isnan(pl):
+                pl = fabs(pl)
+            used += snprintf(
+                buf + used, CARD_MAX, CARD_FORMAT,
+                <long long>weeks[i], <long long>years[i], <long long>counts[i],
+                b"win" if pl >= 0 else b"loss", pl,
+            )
+        return buf[:used]
+    finally:
+        free(buf)
@@ -0,0 +1,96 @@
+"""Check the optional fast paths against their pure-Python fallbacks.
+
+Run with:  python -m unittest test_fast_paths  (from this directory)
+Tests for a fast path are skipped when its optional dependency is missing.
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import trade_analyser as ta
+
+
+def _int64(values):
+    return np.asarray(values, dtype=np.int64)
+
+
+class BuildCardsTest(unittest.TestCase):
+    """_cards.build_cards must write exactly what iter_week_cards writes."""
+
+    def assert_same_cards(self, years, weeks, counts, pls):
+        years, weeks, counts = _int64(years), _int64(weeks), _int64(counts)
+        pls = np.asarray(pls, dtype=np.float64)
+        expected = b''.join(ta.iter_week_cards(years, weeks, counts, pls))
+        self.assertEqual(ta.build_cards(years, weeks, counts, pls), expected)
+
+    @unittest.skipIf(ta.build_cards is None, "_cards extension is not built")
+    def test_edge_values(self):
+        pls = [0.0, -0.0, -0.004, 0.005, 0.015, 2345678.91, -1e300, np.nan,
+               np.copysign(np.nan, -1.0), np.inf, -np.inf]
+        n = len(pls)
+        self.assert_same_cards([2020] * n, [53] + [1] * (n - 1), list(range(n)), pls)
+
+    @unittest.skipIf(ta.build_cards is None, "_cards extension is not built")
+    def test_random_values(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        self.assert_same_cards(
+            rng.integers(2000, 2030, n), rng.integers(1, 54, n),
+            rng.integers(0, 10**9, n), rng.normal(0, 1e4, n),
+        )
+
+    @unittest.skipIf(ta.build_cards is None, "_cards extension is not built")
+    def test_empty(self):
+        self.assert_same_cards([], [], [], [])
+
+
+
+class WeeklyAggregationTest(unittest.TestCase):
+    """The numba weekly kernel must agree with the sort + reduceat path."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.kernel = ta._numba_weekly_kernel()
+
+    def assert_same_weeks(self, yw, net):
+        yw = np.asarray(yw, dtype=np.int32)
+        net = np.asarray(net, dtype=np.float64)
+        keys, counts, sums = ta._weekly_reduceat(yw, net)
+        nb_keys, nb_counts, nb_sums = ta._weekly_numba(yw, net, self.kernel)
+        np.testing.assert_array_equal(nb_keys, keys)
+        np.testing.assert_array_equal(nb_counts, counts)
+        # Chunked partial sums may round differently in the last bits
+        np.testing.assert_allclose(nb_sums, sums, rtol=1e-12, atol=1e-9, equal_nan=True)
+        np.testing.assert_array_equal(np.signbit(nb_sums), np.signbit(sums))
+
+    def setUp(self):
+        if self.kernel is None:
+            self.skipTest("numba is not installed")
+
+    def test_edge_values(self):
+        self.assert_same_weeks(
+            [202053, 202053, 202101, 202101, 202102, 202153, 202401],
+            [1.5, -0.5, -0.0, -0.0, np.nan, 0.0, -2.25],
+        )
+
+    def test_random_values(self):
+        rng = np.random.default_rng(0)
+        n = 100_000
+        yw = rng.integers(2015, 2026, n) * 100 + rng.integers(1, 54, n)
+        self.assert_same_weeks(yw, rng.normal(0, 50, n).round(2))
+
+    def test_empty(self):
+        self.assert_same_weeks([], [])
+
+    def test_dispatch_below_threshold(self):
+        yw = np.array([202401, 202402], dtype=np.int32)
+        net = np.array([1.0, 2.0])
+        for got, expected in zip(ta.aggregate_weekly(yw, net), ta._weekly_reduceat(yw, net)):
+            np.testing.assert_array_equal(got, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
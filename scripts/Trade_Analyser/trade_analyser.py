@@ -3,80 +3,63 @@ import numpy as np
 import argparse
 import sys
 import os
+import gzip
+from datetime import datetime
+from functools import lru_cache
 
-def generate_analysis(input_csv, output_html):
-    try:
-        # 1. Load the CSV
-        if not os.path.exists(input_csv):
-            print(f"Error: File '{input_csv}' not found.")
-            return
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
 
-        df = pd.read_csv(input_csv)
-        
-        # 2. Data Preprocessing
-        # Filter for executed trades with profit data and exclude XAGUSD
-        trades = df[df['Profit'].notnull()].copy()
-        trades = trades[trades['Symbol'] != 'XAGUSD']
-        
-        if trades.empty:
-            print("No valid trade data found after filtering.")
-            return
+try:
+    # C card formatter, built with `cythonize -i _cards.pyx`
+    from _cards import build_cards
+except ImportError:
+    build_cards = None
 
-        # Calculate Net Profit
-        trades['Update Time'] = pd.to_datetime(trades['Update Time'])
-        trades['Commission'] = trades['Commission'].fillna(0)
-        trades['Net Profit'] = trades['Profit'] + trades['Commission']
-        
-        # 3. Metrics Calculation
-        total_trades = len(trades)
-        avg_pl = trades['Net Profit'].mean()
-        wins = trades[trades['Net Profit'] > 0]
-        losses = trades[trades['Net Profit'] <= 0]
-        winrate = (len(wins) / total_trades * 100) if total_trades > 0 else 0
-        
-        gross_profit = wins['Net Profit'].sum()
-        gross_loss = abs(losses['Net Profit'].sum())
-        profit_factor = gross_profit / gross_loss if gross_loss != 0 else np.inf
-        
-        max_profit = trades['Net Profit'].max()
-        max_loss = trades['Net Profit'].min()
-        
-        # 4. Weekly Aggregation
-        trades['Year'] = trades['Update Time'].dt.year
-        trades['Week'] = trades['Update Time'].dt.isocalendar().week
-        weekly_stats = trades.groupby(['Year', 'Week']).agg(
-            Trade_Count=('Net Profit', 'count'),
-            Weekly_Profit=('Net Profit', 'sum')
-        ).reset_index().sort_values(['Year', 'Week'], ascending=False)
+# Only these columns of the order-history export are used by the analysis.
+USECOLS = ['Profit', 'Commission', 'Symbol', 'Update Time']
+DTYPES = {'Profit': 'float64', 'Commission': 'float64', 'Symbol': 'category'}
 
-        # 5. Build HTML Report
-        html_content = f"""
+# Importing numba and loading the cached kernel costs roughly 0.4 s, which the
+# parallel kernel only wins back over sort + reduceat at a few million trades.
+NUMBA_MIN_ROWS = 5_000_000
+
+# Leading rows the polars engine inspects to pick a timestamp format.
+TIME_FORMAT_SAMPLE_ROWS = 1000
+
+# Report markup: static head, formatted summary, one card per week, static tail.
+# The static parts are pre-encoded bytes written as-is on every run.
+HTML_HEAD = b"""
         <!DOCTYPE html>
         <html lang="en">
         <head>
             <meta charset="UTF-8">
             <title>Trading Performance Report</title>
             <style>
-                body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 30px; background-color: #f4f7f6; }}
-                .container {{ max-width: 1100px; margin: auto; background: white; padding: 40px; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.1); }}
-                h1 {{ color: #2c3e50; text-align: center; border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-                .kpi-wrapper {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 20px; margin: 30px 0; }}
-                .kpi-card {{ background: #fff; border: 1px solid #e1e4e8; padding: 20px; border-radius: 10px; text-align: center; transition: transform 0.2s; }}
-                .kpi-card:hover {{ transform: translateY(-5px); box-shadow: 0 5px 15px rgba(0,0,0,0.05); }}
-                .kpi-card h3 {{ margin: 0; color: #7f8c8d; font-size: 0.85rem; text-transform: uppercase; }}
-                .kpi-card p {{ margin: 10px 0 0; font-size: 1.6rem; font-weight: bold; color: #2c3e50; }}
-                table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-                th, td {{ padding: 15px; text-align: left; border-bottom: 1px solid #edf2f7; }}
-                th {{ background-color: #f8fafc; color: #4a5568; }}
-                .win {{ color: #2f855a; font-weight: bold; }}
-                .loss {{ color: #c53030; font-weight: bold; }}
-                .calendar {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(200px, 1fr)); gap: 15px; margin-top: 20px; }}
-                .week-box {{ background: #fff; padding: 15px; border-radius: 8px; border-left: 5px solid #3498db; box-shadow: 0 2px 5px rgba(0,0,0,0.05); }}
+                body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 30px; background-color: #f4f7f6; }
+                .container { max-width: 1100px; margin: auto; background: white; padding: 40px; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.1); }
+                h1 { color: #2c3e50; text-align: center; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+                .kpi-wrapper { display: grid; grid-template-columns: repeat(4, 1fr); gap: 20px; margin: 30px 0; }
+                .kpi-card { background: #fff; border: 1px solid #e1e4e8; padding: 20px; border-radius: 10px; text-align: center; transition: transform 0.2s; }
+                .kpi-card:hover { transform: translateY(-5px); box-shadow: 0 5px 15px rgba(0,0,0,0.05); }
+                .kpi-card h3 { margin: 0; color: #7f8c8d; font-size: 0.85rem; text-transform: uppercase; }
+                .kpi-card p { margin: 10px 0 0; font-size: 1.6rem; font-weight: bold; color: #2c3e50; }
+                table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+                th, td { padding: 15px; text-align: left; border-bottom: 1px solid #edf2f7; }
+                th { background-color: #f8fafc; color: #4a5568; }
+                .win { color: #2f855a; font-weight: bold; }
+                .loss { color: #c53030; font-weight: bold; }
+                .calendar { display: grid; grid-template-columns: repeat(auto-fill, minmax(200px, 1fr)); gap: 15px; margin-top: 20px; }
+                .week-box { background: #fff; padding: 15px; border-radius: 8px; border-left: 5px solid #3498db; box-shadow: 0 2px 5px rgba(0,0,0,0.05); }
             </style>
         </head>
         <body>
             <div class="container">
-                <h1>Execution Analysis: {os.path.basename(input_csv)}</h1>
+                <h1>Execution Analysis: """
+
+SUMMARY_TEMPLATE = """{title}</h1>
                 
                 <div class="kpi-wrapper">
                     <div class="kpi-card"><h3>Trades Executed</h3><p>{total_trades}</p></div>
@@ -94,31 +77,307 @@ def generate_analysis(input_csv, output_html):
 
                 <h2>Weekly Execution Calendar</h2>
                 <div class="calendar">
-                    {''.join([f'''
+                    """
+
+WEEK_CARD_TEMPLATE = '''
                     <div class="week-box">
-                        <strong>Week {int(r.Week)}, {int(r.Year)}</strong><br>
-                        Trades: {int(r.Trade_Count)}<br>
-                        Net P&L: <span class="{'win' if r.Weekly_Profit >= 0 else 'loss'}">${r.Weekly_Profit:.2f}</span>
+                        <strong>Week {w}, {y}</strong><br>
+                        Trades: {c}<br>
+                        Net P&L: <span class="{cls}">${pl:.2f}</span>
                     </div>
-                    ''' for _, r in weekly_stats.iterrows()])}
+                    '''
+
+HTML_TAIL = b"""
                 </div>
             </div>
         </body>
         </html>
         """
+
+# Timestamp layouts tried, in order, when 'Update Time' has to be parsed from text.
+# Month-first comes before day-first to match pandas' default for ambiguous dates.
+TIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y.%m.%d %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+]
+
+def candidate_time_formats(first):
+    """Return the TIME_FORMATS entries that can parse the timestamp string ``first``."""
+    candidates = []
+    for fmt in TIME_FORMATS:
+        try:
+            datetime.strptime(first, fmt)
+        except ValueError:
+            continue
+        candidates.append(fmt)
+    return candidates
+
+def parse_update_time(values):
+    """Parse timestamp strings with a format detected from the first value."""
+    sample = values.dropna()
+    if not sample.empty:
+        for fmt in candidate_time_formats(str(sample.iloc[0])):
+            try:
+                return pd.to_datetime(values, format=fmt, cache=True)
+            except ValueError:
+                continue
+    return pd.to_datetime(values, cache=True)
+
+def read_trades(input_csv):
+    """Read the order history, using pyarrow's multithreaded parser when available.
+
+    'Update Time' is left as read; only the trades that survive filtering are parsed.
+    """
+    try:
+        return pd.read_csv(input_csv, usecols=USECOLS, dtype=DTYPES, engine='pyarrow')
+    except ImportError:
+        return pd.read_csv(input_csv, usecols=USECOLS, dtype=DTYPES, engine='c')
+
+@lru_cache(maxsize=None)
+def _numba_weekly_kernel():
+    """Import numba and compile the weekly kernel on first use; None without numba."""
+    try:
+        from numba import njit, prange, get_num_threads
+    except ImportError:
+        return None
+
+    @njit(parallel=True, cache=True)
+    def weekly_agg(bins, pl, n_bins, n_chunks):
+        # Each chunk fills its own row of partial totals, so no two threads
+        # ever write to the same bin.
+        # Sums start at -0.0, the exact additive identity, so a week of -0.0
+        # trades keeps its sign just as np.add.reduceat does.
+        chunk = (bins.size + n_chunks - 1) // n_chunks
+        counts = np.zeros((n_chunks, n_bins), np.int64)
+        sums = np.full((n_chunks, n_bins), -0.0)
+        for t in prange(n_chunks):
+            for i in range(t * chunk, min(bins.size, (t + 1) * chunk)):
+                b = bins[i]
+                counts[t, b] += 1
+                sums[t, b] += pl[i]
+        total_counts = np.zeros(n_bins, np.int64)
+        total_sums = np.full(n_bins, -0.0)
+        for t in range(n_chunks):
+            total_counts += counts[t]
+            total_sums += sums[t]
+        return total_counts, total_sums
+
+    return weekly_agg, get_num_threads
+
+def _weekly_reduceat(yw, net):
+    order = np.argsort(yw, kind='stable')
+    yw_sorted = yw[order]
+    week_keys, starts = np.unique(yw_sorted, return_index=True)
+    weekly_profit = np.add.reduceat(net[order], starts)
+    trade_counts = np.diff(np.append(starts, yw_sorted.size))
+    return week_keys, trade_counts, weekly_profit
+
+def _weekly_numba(yw, net, kernel):
+    if yw.size == 0:
+        return _weekly_reduceat(yw, net)
+    weekly_agg, get_num_threads = kernel
+    # Map keys to dense bins (53 per ISO year) arithmetically, so no sort is needed
+    first_year = int(yw.min()) // 100
+    bins = (yw // 100 - first_year) * 53 + (yw % 100 - 1)
+    n_bins = (int(yw.max()) // 100 - first_year + 1) * 53
+    counts, sums = weekly_agg(bins, net, n_bins, get_num_threads())
+    used = np.flatnonzero(counts)
+    week_keys = (first_year + used // 53) * 100 + used % 53 + 1
+    return week_keys, counts[used], sums[used]
+
+def aggregate_weekly(yw, net):
+    """Return (week_keys, trade_counts, weekly_profit) for each year-week key, ascending."""
+    kernel = _numba_weekly_kernel() if yw.size >= NUMBA_MIN_ROWS else None
+    if kernel is None:
+        return _weekly_reduceat(yw, net)
+    return _weekly_numba(yw, net, kernel)
+
+@lru_cache(maxsize=8)
+def _load_clean(path, mtime_ns, size):
+    df = read_trades(path)
+    # Filter for executed trades with profit data and exclude XAGUSD
+    profit = df['Profit'].to_numpy()
+    symbols = df['Symbol'].cat
+    codes = symbols.codes.to_numpy()
+    # Compare the int category codes rather than the symbol strings; -1 marks a
+    # missing symbol, so -2 never matches when XAGUSD isn't present at all
+    excluded = symbols.categories.get_loc('XAGUSD') if 'XAGUSD' in symbols.categories else -2
+    if numexpr is not None:
+        # profit == profit is the NaN test; numexpr fuses both predicates in one threaded pass
+        mask = numexpr.evaluate('(profit == profit) & (codes != excluded)')
+    else:
+        mask = ~np.isnan(profit) & (codes != excluded)
+    # Masked indexing yields fresh arrays, so Commission can be zero-filled in place
+    times = df['Update Time'][mask]
+    # Non-trade rows may carry placeholder text in Update Time, so parse only the kept rows
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = parse_update_time(times)
+    times = times.to_numpy()
+    profit = profit[mask]
+    commission = df['Commission'].to_numpy()[mask]
+    np.nan_to_num(commission, copy=False, nan=0.0)
+    # The arrays are shared between calls, so guard them against mutation
+    for arr in (times, profit, commission):
+        arr.flags.writeable = False
+    return times, profit, commission
+
+def load_trades(input_csv):
+    """Return the filtered (times, profit, commission) arrays, cached per file version."""
+    st = os.stat(input_csv)
+    return _load_clean(os.path.abspath(input_csv), st.st_mtime_ns, st.st_size)
+
+def aggregate_polars(input_csv):
+    """Run the load/filter/weekly-sum pipeline as one polars query.
+
+    Returns (net, week_keys, trade_counts, weekly_profit) like the pandas path.
+    """
+    try:
+        import polars as pl
+    except ImportError:
+        raise ImportError("--engine polars needs the 'polars' package (pip install polars)") from None
+
+    lf = pl.scan_csv(input_csv, schema_overrides={'Profit': pl.Float64, 'Commission': pl.Float64})
+
+    # Choose the same fixed format parse_update_time would, from the first kept trades only
+    sample = (
+        lf.head(TIME_FORMAT_SAMPLE_ROWS)
+        .filter(pl.col('Profit').is_not_null() & pl.col('Update Time').is_not_null())
+        .select(pl.col('Update Time').cast(pl.String))
+        .collect()['Update Time']
+    )
+    time_format = None
+    if len(sample):
+        for fmt in candidate_time_formats(sample[0]):
+            if sample.str.to_datetime(format=fmt, strict=False).null_count() == 0:
+                time_format = fmt
+                break
+
+    update_time = pl.col('Update Time').cast(pl.String).str.to_datetime(format=time_format)
+    trades = (
+        # ne_missing keeps rows with an empty Symbol, as the pandas path does
+        lf.filter(pl.col('Profit').is_not_null() & pl.col('Symbol').ne_missing('XAGUSD'))
+        .select(
+            (pl.col('Profit') + pl.col('Commission').fill_null(0)).alias('net'),
+            (update_time.dt.iso_year() * 100 + update_time.dt.week()).cast(pl.Int32).alias('yw'),
+        )
+    )
+    # Trades without a timestamp still count towards the KPIs but have no week
+    weekly = trades.filter(pl.col('yw').is_not_null()).group_by('yw').agg(
+        pl.len().alias('count'),
+        pl.col('net').sum().alias('profit'),
+    )
+    # Collected together, both outputs share one scan of the CSV
+    trades, weekly = pl.collect_all([trades, weekly])
+    return (
+        trades['net'].to_numpy(),
+        weekly['yw'].to_numpy().astype(np.int32),
+        weekly['count'].to_numpy().astype(np.int64),
+        weekly['profit'].to_numpy(),
+    )
+
+def iter_week_cards(years, weeks, counts, pls):
+    """Yield each weekly card as bytes; the pure-Python twin of _cards.build_cards."""
+    classes = np.where(pls >= 0, 'win', 'loss')
+    for y, w, c, k, pl in zip(years, weeks, counts, classes, pls):
+        yield WEEK_CARD_TEMPLATE.format(y=y, w=w, c=c, cls=k, pl=pl).encode('ascii')
+
+def generate_analysis(input_csv, output_html, compress=True, engine='pandas'):
+    try:
+        # 1. Load the CSV
+        if not os.path.exists(input_csv):
+            print(f"Error: File '{input_csv}' not found.")
+            return
+
+        # 2. Data Preprocessing
+        if engine == 'polars':
+            net, week_keys, trade_counts, weekly_profit = aggregate_polars(input_csv)
+        else:
+            times, profit, commission = load_trades(input_csv)
+            # Calculate Net Profit
+            net = profit + commission
+        
+        if net.size == 0:
+            print("No valid trade data found after filtering.")
+            return
+
+        # 3. Metrics Calculation
+        total_trades = net.size
+        avg_pl = net.mean()
+        pos_mask = net > 0
+        wins_count = int(pos_mask.sum())
+        winrate = (wins_count / total_trades * 100) if total_trades > 0 else 0
+        
+        # Multiply by the 0/1 mask rather than branching per element
+        gross_profit = float((net * pos_mask).sum())
+        gross_loss = -float((net * ~pos_mask).sum())
+        profit_factor = gross_profit / gross_loss if gross_loss != 0 else np.inf
         
-        with open(output_html, "w") as f:
-            f.write(html_content)
+        max_profit = net.max()
+        max_loss = net.min()
+        
+        # 4. Weekly Aggregation
+        if engine != 'polars':
+            # Trades without a timestamp still count towards the KPIs but have no week
+            valid = ~np.isnat(times)
+            # Single int32 key (ISO year * 100 + ISO week)
+            iso = pd.Series(times[valid]).dt.isocalendar()
+            yw = iso['year'].to_numpy(dtype=np.int32) * 100 + iso['week'].to_numpy(dtype=np.int32)
+            week_keys, trade_counts, weekly_profit = aggregate_weekly(yw, net[valid])
+        # Newest week first: one argsort on the composite key replaces a two-column sort
+        order = np.argsort(week_keys)[::-1]
+        week_keys = week_keys[order]
+
+        # 5. Build HTML Report
+        years = week_keys // 100
+        weeks = week_keys % 100
+        counts = trade_counts[order]
+        pls = weekly_profit[order]
+        if compress:
+            # Level 1 keeps CPU cost negligible while the repetitive markup still shrinks several-fold
+            if not output_html.endswith('.gz'):
+                output_html += '.gz'
+            out = gzip.open(output_html, "wb", compresslevel=1)
+        else:
+            out = open(output_html, "wb", buffering=1 << 20)
+        with out as f:
+            f.write(HTML_HEAD)
+            f.write(SUMMARY_TEMPLATE.format(
+                title=os.path.basename(input_csv),
+                total_trades=total_trades,
+                avg_pl=avg_pl,
+                winrate=winrate,
+                profit_factor=profit_factor,
+                max_profit=max_profit,
+                max_loss=max_loss,
+            ).encode('utf-8'))
+            if build_cards is not None:
+                f.write(build_cards(
+                    np.ascontiguousarray(years, dtype=np.int64),
+                    np.ascontiguousarray(weeks, dtype=np.int64),
+                    np.ascontiguousarray(counts, dtype=np.int64),
+                    np.ascontiguousarray(pls, dtype=np.float64),
+                ))
+            else:
+                f.writelines(iter_week_cards(years, weeks, counts, pls))
+            f.write(HTML_TAIL)
             
         print(f"Analysis complete. Dashboard saved to: {output_html}")
 
+    except ImportError as e:
+        print(f"Error: {e}")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate an HTML trade analysis report from a CSV file.")
     parser.add_argument("input", help="Path to the input CSV file")
-    parser.add_argument("-o", "--output", default="analysis_report.html", help="Path for the output HTML file (default: analysis_report.html)")
+    parser.add_argument("-o", "--output", default="analysis_report.html", help="Path for the output HTML file; '.gz' is appended unless --no-compress is given (default: analysis_report.html)")
+    parser.add_argument("--no-compress", action="store_true", help="Write plain HTML instead of gzip-compressed <output>.gz")
+    parser.add_argument("--engine", choices=["pandas", "polars"], default="pandas", help="Dataframe library used to load and aggregate the trades (default: pandas)")
     
     args = parser.parse_args()
-    generate_analysis(args.input, args.output)
\ No newline at end of file
+    generate_analysis(args.input, args.output, compress=not args.no_compress, engine=args.engine)
\ No newline at end of file